@@ -7,6 +7,35 @@ as $$
     where schemaname = schema_name;
 $$;
 
+-- Tables of a schema mapped to their column names, in table name and column order.
+-- Reads the catalog directly, so tables whose columns the role cannot see are still listed.
+create or replace function describe_schema(schema_name text default 'public')
+returns json
+language sql
+as $$
+    select coalesce(json_object_agg(t.table_name, t.columns order by t.table_name), '{}'::json)
+    from (
+        select c.relname as table_name,
+               coalesce(
+                   json_agg(a.attname order by a.attnum) filter (where a.attnum is not null),
+                   '[]'::json
+               ) as columns
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        left join pg_attribute a on a.attrelid = c.oid and a.attnum > 0 and not a.attisdropped
+        where n.nspname = schema_name and c.relkind in ('r', 'p')
+        group by c.relname
+    ) t;
+$$;
+
+-- No-op used by the server to open its connection at startup
+create or replace function ping()
+returns int
+language sql
+as $$
+    select 1;
+$$;
+
 -- Allow all users to read all rows (for testing)
 create policy "Allow read access to all"
 on users
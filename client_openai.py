@@ -1,23 +1,119 @@
 import asyncio
-from typing import Optional
-from contextlib import AsyncExitStack
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from contextlib import AsyncExitStack, suppress
 from dotenv import load_dotenv
 import os
 
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 
-import openai
+import httpx
+import orjson
+from openai import AsyncOpenAI
 
 load_dotenv()  # Load environment variables from .env
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Seconds before the cached tool list is fetched again from the MCP server
+TOOLS_CACHE_TTL = 60
+
+# Read-only tools whose results can be reused for identical arguments
+DETERMINISTIC_TOOLS = {"read_table_rows", "list_tables", "describe_schema"}
+TOOL_RESULT_CACHE_SIZE = 256
+# Seconds a cached tool result is reused. This sits on top of the server's own read cache, so
+# writes made outside this client can stay invisible for up to this plus the server's TTL
+TOOL_RESULT_CACHE_TTL = 10
+
+# Kept byte-identical across queries so OpenAI can serve it from its prompt cache
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant."}
+
+# Seconds of streamed text to buffer before yielding it to the caller
+STREAM_FLUSH_INTERVAL = 0.05
+
+
+def _plain_schema(schema: Any) -> Dict[str, Any]:
+    """Convert a tool input schema to a plain dict once so it is not re-serialized per request."""
+    if hasattr(schema, "model_dump"):
+        return schema.model_dump(exclude_none=True)
+    return dict(schema)
+
+
+class _BatchScheduler:
+    """Collects concurrent queries over a short window and dispatches them together."""
+
+    def __init__(self, handler: Callable[[str], Awaitable[str]], window: float):
+        self._handler = handler
+        self._window = window
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._futures: Set[asyncio.Future] = set()
+
+    async def submit(self, query: str) -> str:
+        """Queue a query and wait for its response."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        await self._queue.put((query, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self._window)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Every query gets its own run, even if identical: a query may trigger a write tool,
+        # which must execute once per caller
+        results = await asyncio.gather(*(self._handler(query) for query, _ in batch), return_exceptions=True)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Stop the scheduler, cancel any in-flight dispatches and fail their pending queries."""
+        for task in [self._task, *self._dispatches]:
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        # Queued or cancelled queries would otherwise leave their callers awaiting forever
+        for future in list(self._futures):
+            future.cancel()
 
 
 class MCPClient:
-    def __init__(self):
+    def __init__(self, use_tool_cache: bool = True, batch_window: Optional[float] = None):
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
+        # Shared HTTP/2 keep-alive pool so OpenAI calls skip repeated TLS handshakes
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+        self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=self._http)
+        self.openai_tools: List[Dict[str, Any]] = []
+        self.tool_map: Dict[str, Any] = {}
+        self._tools_cache_ts = 0.0
+        self._tools_ttl = TOOLS_CACHE_TTL
+        self.use_tool_cache = use_tool_cache
+        self._tool_result_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Concurrent queries are coalesced over `batch_window` seconds when set
+        self._batcher = _BatchScheduler(self._process_query, batch_window) if batch_window else None
 
     async def connect_to_server(self, server_script_path: str):
         """Connect to an MCP server."""
@@ -31,73 +127,162 @@ class MCPClient:
         )
 
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        self.stdio, self.write = stdio_transport
+        await self._start_session(stdio_transport)
+
+    async def connect_to_sse_server(self, server_url: str):
+        """Connect to an already running MCP server over SSE (e.g. http://localhost:8000/sse)."""
+        sse_transport = await self.exit_stack.enter_async_context(sse_client(server_url))
+        await self._start_session(sse_transport)
+
+    async def _start_session(self, transport: Tuple[Any, Any]):
+        """Initialize the MCP session over the given transport and cache its tools."""
+        self.stdio, self.write = transport
         self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
 
         await self.session.initialize()
 
         response = await self.session.list_tools()
         tools = response.tools
+        self._cache_tools(tools)
         print("\nConnected to server with tools:", [tool.name for tool in tools])
 
-    async def process_query(self, query: str) -> str:
-        """Process a query using OpenAI GPT-4 and available MCP tools."""
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": query}
-        ]
-
-        tool_response = await self.session.list_tools()
-        openai_tools = []
-        tool_map = {}
-
-        for tool in tool_response.tools:
-            tool_def = {
+    def _cache_tools(self, tools: List[Any]):
+        """Build the OpenAI tool definitions and tool map once for the given MCP tools."""
+        self.openai_tools = [
+            {
                 "type": "function",
                 "function": {
                     "name": tool.name,
                     "description": tool.description,
-                    "parameters": tool.inputSchema
+                    "parameters": _plain_schema(tool.inputSchema)
                 }
             }
-            openai_tools.append(tool_def)
-            tool_map[tool.name] = tool
+            for tool in tools
+        ]
+        self.tool_map = {tool.name: tool for tool in tools}
+        self._tools_cache_ts = time.monotonic()
 
-        # First request to GPT-4
-        response = openai.ChatCompletion.create(
+    async def _get_tools(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return the OpenAI tool definitions and tool map, refreshing them once the TTL expires."""
+        if not self.tool_map or time.monotonic() - self._tools_cache_ts >= self._tools_ttl:
+            tool_response = await self.session.list_tools()
+            self._cache_tools(tool_response.tools)
+        return self.openai_tools, self.tool_map
+
+    async def _call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        """Call an MCP tool, reusing recent results for deterministic tools.
+
+        Any other tool may write to the database, so calling one drops every cached result.
+        Calls that pass use_cache=False always reach the server.
+        """
+        if tool_name not in DETERMINISTIC_TOOLS:
+            try:
+                return await self.session.call_tool(tool_name, tool_args)
+            finally:
+                self._tool_result_cache.clear()
+        if not self.use_tool_cache or tool_args.get("use_cache") is False:
+            return await self.session.call_tool(tool_name, tool_args)
+
+        key = f"{tool_name}:{orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS).decode()}"
+        entry = self._tool_result_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < TOOL_RESULT_CACHE_TTL:
+            self._tool_result_cache.move_to_end(key)
+            return entry[1]
+
+        result = await self.session.call_tool(tool_name, tool_args)
+        if not result.isError:
+            self._tool_result_cache[key] = (time.monotonic(), result)
+            self._tool_result_cache.move_to_end(key)
+            if len(self._tool_result_cache) > TOOL_RESULT_CACHE_SIZE:
+                self._tool_result_cache.popitem(last=False)
+        return result
+
+    async def process_query(self, query: str) -> str:
+        """Process a query using OpenAI GPT-4 and available MCP tools."""
+        if self._batcher is not None:
+            return await self._batcher.submit(query)
+        return await self._process_query(query)
+
+    async def _process_query(self, query: str) -> str:
+        return "".join([text async for text in self.stream_query(query)]).strip()
+
+    async def _stream_completion(self, tool_calls: Dict[int, Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream a GPT-4 completion, yielding text in batches and collecting tool call deltas into tool_calls."""
+        stream = await self._client.chat.completions.create(
             model="gpt-4-1106-preview",
-            messages=messages,
-            tools=openai_tools,
-            tool_choice="auto"
+            stream=True,
+            **kwargs
         )
 
-        finish_reason = response.choices[0].finish_reason
-        message = response.choices[0].message
+        buffer: List[str] = []
+        last_flush = time.monotonic()
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
 
-        # Handle tool call
-        if finish_reason == "tool_calls":
-            tool_call = message.tool_calls[0]
-            tool_name = tool_call.function.name
-            tool_args = tool_call.function.arguments
+            if delta.content:
+                buffer.append(delta.content)
+                if time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    last_flush = time.monotonic()
 
-            # Execute the tool via MCP
-            result = await self.session.call_tool(tool_name, eval(tool_args))  # ⚠️ safe args parsing in production
+            for tool_call in delta.tool_calls or []:
+                entry = tool_calls.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+                if tool_call.id:
+                    entry["id"] = tool_call.id
+                if tool_call.function and tool_call.function.name:
+                    entry["name"] += tool_call.function.name
+                if tool_call.function and tool_call.function.arguments:
+                    entry["arguments"] += tool_call.function.arguments
+
+        if buffer:
+            yield "".join(buffer)
+
+    async def stream_query(self, query: str) -> AsyncIterator[str]:
+        """Process a query using OpenAI GPT-4 and available MCP tools, yielding the response as it streams."""
+        messages = [
+            SYSTEM_MESSAGE,
+            {"role": "user", "content": query}
+        ]
+
+        openai_tools, tool_map = await self._get_tools()
+
+        # First request to GPT-4
+        tool_calls: Dict[int, Dict[str, str]] = {}
+        async for text in self._stream_completion(tool_calls, messages=messages, tools=openai_tools, tool_choice="auto"):
+            yield text
+
+        # Handle tool calls, executing them concurrently via MCP
+        if tool_calls:
+            ordered_calls = [tool_calls[index] for index in sorted(tool_calls)]
+            results = await asyncio.gather(*(
+                self._call_tool(tool_call["name"], orjson.loads(tool_call["arguments"]))
+                for tool_call in ordered_calls
+            ))
 
-            messages.append(message)
             messages.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": result.content
+                "role": "assistant",
+                "tool_calls": [
+                    {
+                        "id": tool_call["id"],
+                        "type": "function",
+                        "function": {"name": tool_call["name"], "arguments": tool_call["arguments"]}
+                    }
+                    for tool_call in ordered_calls
+                ]
             })
+            for tool_call, result in zip(ordered_calls, results):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "content": result.content
+                })
 
-            # Get the final response from GPT-4
-            final_response = openai.ChatCompletion.create(
-                model="gpt-4-1106-preview",
-                messages=messages
-            )
-            return final_response.choices[0].message.content.strip()
-
-        return message.get("content", "").strip()
+            # Stream the final response from GPT-4; the same tools keep the cached prompt prefix intact
+            async for text in self._stream_completion({}, messages=messages, tools=openai_tools, tool_choice="none"):
+                yield text
 
     async def chat_loop(self):
         """Run an interactive chat loop."""
@@ -114,4 +299,8 @@ class MCPClient:
 
     async def cleanup(self):
         """Clean up resources."""
+        if self._batcher is not None:
+            await self._batcher.close()
         await self.exit_stack.aclose()
+        await self._client.close()
+        await self._http.aclose()
@@ -1,22 +1,448 @@
 import os
-import json
-from typing import Dict, List, Any, Optional, Union
+import copy
+import asyncio
+from typing import Annotated, Callable, Dict, List, Any, Optional, Tuple, Union
 from contextlib import asynccontextmanager
+from collections import OrderedDict
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from postgrest import APIError, AsyncRequestBuilder, AsyncSelectRequestBuilder
+from postgrest.types import CountMethod, ReturnMethod
+from pydantic import BaseModel, Field, TypeAdapter
+from supabase import acreate_client, AsyncClient
 from mcp.server.fastmcp import FastMCP, Context
 
-# Load environment variables from .env file
+# Load environment variables from .env file; variables already set in the environment take precedence
 load_dotenv()
 
+class SupabaseToolError(Exception):
+    """Raised when a tool's Supabase operation fails; the message is only formatted when displayed."""
+
+    def __init__(self, action: str, table: Optional[str], cause: BaseException):
+        super().__init__(action, table, cause)
+        self.action = action
+        self.table = table
+        self.cause = cause
+
+    def __str__(self) -> str:
+        target = f" table '{self.table}'" if self.table else ""
+        return f"An error occurred while {self.action}{target}: {self.cause}"
+
+# Short-lived caches for read-only tools; table lists and reference rows change rarely.
+# Keys start with the client's (url, key), since what a key may see depends on its role and RLS.
+_tables_cache: TTLCache = TTLCache(maxsize=128, ttl=30)
+_rows_cache: TTLCache = TTLCache(maxsize=512, ttl=int(os.getenv("READ_CACHE_TTL", "10")))
+# Larger read results are not cached, so whole-table reads cannot pile up in memory
+READ_CACHE_MAX_ROWS = 1000
+
+# Maximum number of rows sent in a single insert request
+INSERT_BATCH_SIZE = int(os.getenv("SUPABASE_INSERT_BATCH", "500"))
+# Record lists longer than this are loaded with COPY when SUPABASE_DB_URL is set for the session's project
+COPY_THRESHOLD = int(os.getenv("SUPABASE_COPY_THRESHOLD", "5000"))
+# Maximum number of insert batches in flight at once
+INSERT_CONCURRENCY = 8
+# Maximum number of Supabase clients (one per credential pair) kept alive between lifespans
+MAX_CLIENTS = 32
+# Seconds the connection prewarm ping may delay the first session for a client
+PREWARM_TIMEOUT = 2
+# SQLSTATEs of unique and exclusion violations; these usually affect only some rows of a batch,
+# unlike NOT NULL or CHECK violations, which tend to fail every row and are raised instead
+ROW_CONFLICT_ERRORS = frozenset(("23505", "23P01"))
+# PostgREST error code for an RPC function that does not exist
+FUNCTION_NOT_FOUND = "PGRST202"
+
+# Validation messages shared by the tools
+_ERR_TABLE = "Invalid table_name provided. Must be a non-empty string."
+_ERR_LIMIT = "Invalid limit provided. Must be a positive integer."
+_ERR_FILTERS = "Invalid filters provided. Must be a dictionary."
+_ERR_ORDER_BY = "Invalid order_by provided. Must be a string."
+_ERR_UPDATES = "Invalid updates provided. Must be a non-empty dictionary."
+_ERR_FILTERS_REQUIRED = "Invalid filters provided. Must be a non-empty dictionary."
+_ERR_PAGE_SIZE = "Invalid page_size provided. Must be a positive integer."
+
+# Column names treated as primary keys when ordering filters
+_PRIMARY_KEY_COLUMNS = frozenset(("id", "uuid", "pk"))
+
+def _validate(
+    table_name: Any,
+    limit: Any = None,
+    filters: Any = None,
+    order_by: Any = None,
+    page_size: Any = None
+) -> None:
+    """
+    Validates common tool arguments, raising ValueError on the first invalid one.
+
+    Args:
+        table_name: The table name; must be a non-empty string.
+        limit: Optional row limit; must be a positive integer when given.
+        filters: Optional filters; must be a dictionary when given.
+        order_by: Optional ordering column; must be a string when given.
+        page_size: Optional page size; must be a positive integer when given.
+    """
+    if not (table_name and isinstance(table_name, str)):
+        raise ValueError(_ERR_TABLE)
+    if limit is not None and (not isinstance(limit, int) or limit <= 0):
+        raise ValueError(_ERR_LIMIT)
+    if filters and not isinstance(filters, dict):
+        raise ValueError(_ERR_FILTERS)
+    if order_by and not isinstance(order_by, str):
+        raise ValueError(_ERR_ORDER_BY)
+    if page_size is not None and (not isinstance(page_size, int) or page_size <= 0):
+        raise ValueError(_ERR_PAGE_SIZE)
+
+def _apply_filters(query: Any, filters: Dict[str, Any]) -> Any:
+    """
+    Applies filters to a PostgREST query in as few builder calls as possible.
+
+    Filters are emitted in a stable order with likely primary-key columns first, so
+    equivalent requests produce the same query string and the key predicate leads. Runs of
+    scalar values are applied together with one match() call; list, tuple and set values
+    become in_() filters so one request covers all of them.
+
+    Args:
+        query: The PostgREST filter builder to extend.
+        filters: Column-value pairs to filter on.
+
+    Returns:
+        The filter builder with all filters applied.
+    """
+    scalar: Dict[str, Any] = {}
+    for column, value in sorted(filters.items(), key=lambda item: (item[0] not in _PRIMARY_KEY_COLUMNS, item[0])):
+        if isinstance(value, (list, tuple, set)):
+            if scalar:
+                query = query.match(scalar)
+                scalar = {}
+            query = query.in_(column, list(value))
+        else:
+            scalar[column] = value
+    if scalar:
+        query = query.match(scalar)
+    return query
+
+def _write_options(return_rows: bool) -> Dict[str, Any]:
+    """
+    Returns PostgREST write options for the requested response shape.
+
+    Unless rows are requested, PostgREST is asked for an exact count with an empty body,
+    so the modified rows are neither serialized by the server nor decoded here.
+
+    Args:
+        return_rows: Whether the written rows should be returned.
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for insert()/update()/delete().
+    """
+    if return_rows:
+        return {"returning": ReturnMethod.representation}
+    return {"returning": ReturnMethod.minimal, "count": CountMethod.exact}
+
+def _write_result(response: Any, return_rows: bool) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Extracts the returned rows and affected row count from a write response.
+
+    Args:
+        response: The PostgREST API response.
+        return_rows: Whether the write was made with _write_options(True).
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The returned rows (empty unless requested) and the row count.
+    """
+    if return_rows:
+        data = response.data or []
+        return data, len(data)
+    return [], response.count or 0
+
+async def _insert_with_fallback(
+    builder: AsyncRequestBuilder,
+    rows: List[Dict[str, Any]],
+    options: Dict[str, Any],
+    return_rows: bool,
+    errors: List[Dict[str, Any]],
+    failures: List[Tuple[int, int, BaseException]],
+    offset: int = 0,
+    bisected: bool = False
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Inserts rows in one request, bisecting the batch when it is rejected by a row conflict.
+
+    A unique or exclusion violation fails the whole statement, so the batch is split in
+    halves and retried until only the offending rows are left; these are appended to errors
+    instead of failing the load. Once split, the halves commit independently, so any other
+    error in a half is recorded in failures rather than raised, keeping the rows committed by
+    the other half counted. Other errors of an unsplit batch are raised unchanged.
+
+    Args:
+        builder: The request builder of the target table.
+        rows: The records to insert.
+        options: Write options from _write_options().
+        return_rows: Whether the write was made with _write_options(True).
+        errors: Collects {'record', 'error'} entries for rows that could not be inserted.
+        failures: Collects (offset, size, error) for sub-batches that failed after a split.
+        offset: The index of rows[0] in the caller's records.
+        bisected: Whether rows is a half of a split batch.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The returned rows (empty unless requested) and the row count.
+    """
+    try:
+        return _write_result(await builder.insert(rows, **options).execute(), return_rows)
+    except Exception as e:
+        if isinstance(e, APIError) and e.code in ROW_CONFLICT_ERRORS:
+            if len(rows) == 1:
+                errors.append({"record": rows[0], "error": e.message})
+                return [], 0
+        elif bisected:
+            failures.append((offset, len(rows), e))
+            return [], 0
+        else:
+            raise
+    middle = len(rows) // 2
+    left_data, left_count = await _insert_with_fallback(
+        builder, rows[:middle], options, return_rows, errors, failures, offset, True
+    )
+    right_data, right_count = await _insert_with_fallback(
+        builder, rows[middle:], options, return_rows, errors, failures, offset + middle, True
+    )
+    return left_data + right_data, left_count + right_count
+
+def _invalidate_rows(supabase_url: str, table_name: str) -> None:
+    """
+    Drops cached read_table_rows results for a table after it has been written to.
+
+    Args:
+        supabase_url: The project URL the table belongs to.
+        table_name: The name of the table that changed.
+    """
+    # Cached reads for every key of the project are dropped, as they all see the same table
+    for key in [key for key in _rows_cache if key[0] == supabase_url and key[2] == table_name]:
+        _rows_cache.pop(key, None)
+
+async def _paginate(
+    build_query: Callable[[], Any],
+    page_size: int,
+    limit: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields rows page by page using PostgREST range requests, until a page comes back empty.
+
+    Args:
+        build_query: Returns a fresh filtered query; range() mutates the builder, so each page needs its own.
+        page_size: The number of rows requested per page.
+        limit: Optional total number of rows after which paging stops.
+
+    Yields:
+        Dict[str, Any]: The rows, in page order.
+    """
+    offset = 0
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        page = (await build_query().range(offset, offset + size - 1).execute()).data
+        # A short page does not mean the end: PostgREST caps pages at its max-rows setting
+        if not page:
+            break
+        for row in page:
+            yield row
+        offset += len(page)
+
+def _to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Converts a list of row dictionaries into a dictionary of column value lists.
+
+    Args:
+        rows: Rows as returned by PostgREST; every row has the same keys.
+
+    Returns:
+        Dict[str, List[Any]]: Column names mapped to their values in row order.
+    """
+    if not rows:
+        return {}
+    return {column: [row[column] for row in rows] for column in rows[0]}
+
+def _copy_db_url(supabase_url: str) -> Optional[str]:
+    """
+    Returns the Postgres connection string for COPY loads into the session's project.
+
+    SUPABASE_DB_URL belongs to the project in SUPABASE_URL, so it is only used when the
+    session was opened for that project and not for one passed in the client request.
+
+    Args:
+        supabase_url: The project URL of the session's client.
+
+    Returns:
+        Optional[str]: SUPABASE_DB_URL, or None if it is unset or belongs to another project.
+    """
+    db_url = os.getenv("SUPABASE_DB_URL")
+    env_url = os.getenv("SUPABASE_URL")
+    if not (db_url and env_url) or supabase_url.rstrip("/") != env_url.rstrip("/"):
+        return None
+    return db_url
+
+async def _copy_rows(db_url: str, table_name: str, records: List[Dict[str, Any]]) -> int:
+    """
+    Loads rows into a table with COPY over a direct Postgres connection.
+
+    Columns are the union of the record keys; keys missing from a record are loaded as NULL.
+    Dictionary values are loaded as jsonb, while lists are loaded as Postgres arrays.
+
+    Args:
+        db_url: The Postgres connection string, from _copy_db_url().
+        table_name: The name of the table to load into.
+        records: The rows to load.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    # Imported here so servers that never use COPY do not pay psycopg's import cost at startup
+    import psycopg
+    from psycopg import sql
+    from psycopg.types.json import Jsonb
+
+    columns = list(dict.fromkeys(column for record in records for column in record))
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table_name),
+        sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    async with await psycopg.AsyncConnection.connect(db_url) as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy(statement) as copy:
+                for record in records:
+                    await copy.write_row(tuple(
+                        Jsonb(value) if isinstance(value, dict) else value
+                        for value in (record.get(column) for column in columns)
+                    ))
+    return len(records)
+
+class ColumnDef(BaseModel):
+    """Column definition accepted by create_table."""
+    name: str = Field(min_length=1)
+    type: str = Field(min_length=1)
+    constraints: Optional[str] = None
+
+# Compiled once so create_table validates the raw column dicts in pydantic-core rather than Python loops
+_COLUMNS_ADAPTER = TypeAdapter(Annotated[List[ColumnDef], Field(min_length=1)])
+
 # Create a dataclass for our application context
 @dataclass
 class SupabaseContext:
     """Context for the Supabase MCP server."""
-    client: Client
+    client: AsyncClient
+    builders: Dict[str, AsyncRequestBuilder] = field(default_factory=dict)
+    selects: Dict[Tuple[str, str], AsyncSelectRequestBuilder] = field(default_factory=dict)
+
+    def table(self, table_name: str) -> AsyncRequestBuilder:
+        """
+        Returns the PostgREST request builder for a table, reusing it across tool calls.
+
+        The builder only holds the HTTP session and table path; select/insert/update/delete
+        each return a new query object, so it is safe to share between calls.
+
+        Args:
+            table_name: The name of the table.
+
+        Returns:
+            AsyncRequestBuilder: The cached request builder for the table.
+        """
+        builder = self.builders.get(table_name)
+        if builder is None:
+            builder = self.builders[table_name] = self.client.table(table_name)
+        return builder
+
+    def select(self, table_name: str, columns: str) -> AsyncSelectRequestBuilder:
+        """
+        Returns a fresh SELECT query for a table and column list from a cached template.
+
+        Filter, order and limit calls reassign the builder's immutable query params, so a
+        shallow copy (with its own headers) can be extended without touching the template.
+
+        Args:
+            table_name: The name of the table.
+            columns: Comma-separated list of columns to select.
+
+        Returns:
+            AsyncSelectRequestBuilder: A query builder ready for filters.
+        """
+        template = self.selects.get((table_name, columns))
+        if template is None:
+            template = self.selects[(table_name, columns)] = self.table(table_name).select(columns)
+        query = copy.copy(template)
+        query.headers = template.headers.copy()
+        return query
+
+# Clients by (url, key) in least-recently-used order, and the number of open lifespans using each
+_clients: "OrderedDict[Tuple[str, str], AsyncClient]" = OrderedDict()
+_client_users: Dict[AsyncClient, int] = {}
+_clients_lock = asyncio.Lock()
+
+async def _prewarm(client: AsyncClient) -> None:
+    """
+    Opens the PostgREST connection of a new client with a no-op 'ping' RPC call.
+
+    This moves the DNS, TCP and TLS setup from the first tool call to session startup.
+    The ping is given at most PREWARM_TIMEOUT seconds so an unreachable project cannot hold
+    up the session, and failures are ignored, since the first tool call would simply
+    connect on its own.
+
+    Args:
+        client: The freshly created Supabase client.
+    """
+    try:
+        await asyncio.wait_for(client.rpc('ping').execute(), timeout=PREWARM_TIMEOUT)
+    except Exception:
+        pass
+
+async def _client(url: str, key: str) -> AsyncClient:
+    """
+    Returns a Supabase client for the given credentials, reusing it across lifespans.
+
+    Reusing the client keeps its HTTP connection pool (and TLS sessions) warm for
+    repeated connections with the same credentials. At most MAX_CLIENTS clients are kept;
+    the least recently used one is closed once no lifespan is using it. Every call must be
+    paired with _release_client().
+
+    Args:
+        url: The Supabase project URL.
+        key: The Supabase service role key.
+
+    Returns:
+        AsyncClient: The cached Supabase client.
+    """
+    evicted = []
+    async with _clients_lock:
+        client = _clients.get((url, key))
+        created = client is None
+        if created:
+            client = _clients[(url, key)] = await acreate_client(url, key)
+            while len(_clients) > MAX_CLIENTS:
+                evicted.append(_clients.popitem(last=False)[1])
+        else:
+            _clients.move_to_end((url, key))
+        _client_users[client] = _client_users.get(client, 0) + 1
+    for old in evicted:
+        if old not in _client_users:
+            await old.postgrest.aclose()
+    if created:
+        await _prewarm(client)
+    return client
+
+async def _release_client(client: AsyncClient) -> None:
+    """
+    Marks a lifespan as done with a client, closing it if it was evicted meanwhile.
+
+    Args:
+        client: A client returned by _client().
+    """
+    users = _client_users.get(client, 1) - 1
+    if users > 0:
+        _client_users[client] = users
+        return
+    _client_users.pop(client, None)
+    if not any(cached is client for cached in _clients.values()):
+        await client.postgrest.aclose()
 
 @asynccontextmanager
 async def supabase_lifespan(server: FastMCP) -> AsyncIterator[SupabaseContext]:
@@ -29,27 +455,25 @@ async def supabase_lifespan(server: FastMCP) -> AsyncIterator[SupabaseContext]:
     Yields:
         SupabaseContext: The context containing the Supabase client
     """
-    # Try to get from client request first
-    supabase_url = server.client_request.get('supabase_url') if hasattr(server, 'client_request') and server.client_request else None
-    supabase_key = server.client_request.get('supabase_key') if hasattr(server, 'client_request') and server.client_request else None
-
-    # Fallback to environment variables
-    if not supabase_url:
-        supabase_url = os.getenv('SUPABASE_URL')
-    if not supabase_key:
-        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    # Prefer credentials from the client request, then fall back to environment variables
+    request = getattr(server, 'client_request', None) or {}
+    supabase_url = request.get('supabase_url') or os.getenv('SUPABASE_URL')
+    supabase_key = (
+        request.get('supabase_key')
+        or os.getenv('SUPABASE_SERVICE_KEY')
+        or os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    )
 
     if not supabase_url or not supabase_key:
-        raise ValueError("Missing Supabase credentials. Ensure SUPABASE_URL and SUPABASE_SERVICE_KEY are set as environment variables or included in the client request under 'supabase_url' and 'supabase_key' keys. For environment variables, you can set them in a .env file or directly in your terminal before running the server.")
-
-    # Initialize Supabase client
-    supabase_client = create_client(supabase_url, supabase_key)
+        raise ValueError("Missing Supabase credentials. Ensure SUPABASE_URL and SUPABASE_SERVICE_KEY (or SUPABASE_SERVICE_ROLE_KEY) are set as environment variables or included in the client request under 'supabase_url' and 'supabase_key' keys. For environment variables, you can set them in a .env file or directly in your terminal before running the server.")
 
+    # Initialize Supabase client, reusing one already built for these credentials
+    supabase_client = await _client(supabase_url, supabase_key)
     try:
         yield SupabaseContext(client=supabase_client)
     finally:
-        # No explicit cleanup needed for Supabase client
-        pass
+        # The client stays cached for later lifespans unless it has been evicted
+        await _release_client(supabase_client)
 
 # Create the MCP server instance using the lifespan manager
 mcp = FastMCP(
@@ -59,15 +483,18 @@ mcp = FastMCP(
 )
 
 @mcp.tool()
-def read_table_rows(
+async def read_table_rows(
     ctx: Context,
     table_name: str,
     columns: str = "*",
     filters: Optional[Dict[str, Any]] = None,
     limit: Optional[int] = None,
     order_by: Optional[str] = None,
-    ascending: bool = True
-) -> List[Dict[str, Any]]:
+    ascending: bool = True,
+    use_cache: bool = True,
+    columnar: bool = False,
+    page_size: Optional[int] = None
+) -> str:
     """
     Reads rows from a specified Supabase table with optional filtering, ordering, and limiting.
 
@@ -79,198 +506,410 @@ def read_table_rows(
         limit (Optional[int]): The maximum number of rows to return.
         order_by (Optional[str]): Column name to order results by.
         ascending (bool): Whether to sort in ascending order (default: True).
+        use_cache (bool): Whether to serve repeated identical reads from a short-lived cache (default: True).
+            Entries expire after READ_CACHE_TTL seconds and are dropped when this server writes to the table;
+            results over READ_CACHE_MAX_ROWS rows are not cached.
+        columnar (bool): Whether to return a column-name-to-values mapping instead of a list of rows (default: False).
+        page_size (Optional[int]): When set, fetch rows in pages of this size using range requests instead of
+            one request for the whole result, so results are not truncated by PostgREST's max-rows
+            setting. Combine with order_by for a stable page order.
 
     Returns:
-        List[Dict[str, Any]]: A list of rows (as dictionaries) from the table, or raises an error on failure.
+        str: A JSON array of rows (as objects) from the table, or a JSON object of column lists when
+        columnar is True. Raises an error on failure.
+    """
+    context = ctx.request_context.lifespan_context
+    try:
+        _validate(table_name, limit=limit, filters=filters, order_by=order_by, page_size=page_size)
+
+        def build_query() -> Any:
+            query = context.select(table_name, columns)
+            if filters:
+                query = _apply_filters(query, filters)
+            if order_by:
+                query = query.order(order_by, desc=not ascending)
+            return query
+
+        cache_key = None
+        if use_cache:
+            try:
+                cache_key = (
+                    context.client.supabase_url, context.client.supabase_key, table_name, columns,
+                    tuple(sorted((filters or {}).items())), limit, order_by, ascending, page_size
+                )
+                hash(cache_key)
+            except TypeError:
+                # Filters with unhashable values (e.g. lists) are never cached
+                cache_key = None
+
+        if cache_key is not None and cache_key in _rows_cache:
+            rows = _rows_cache[cache_key]
+        else:
+            if page_size:
+                rows = [row async for row in _paginate(build_query, page_size, limit)]
+            else:
+                query = build_query()
+                if limit:
+                    query = query.limit(limit)
+                rows = (await query.execute()).data
+            if cache_key is not None and len(rows) <= READ_CACHE_MAX_ROWS:
+                _rows_cache[cache_key] = rows
+        # Encoded here with orjson so FastMCP does not serialize each row separately
+        return orjson.dumps(_to_columnar(rows) if columnar else rows).decode()
+    except Exception as e:
+        raise SupabaseToolError("reading rows from", table_name, e) from e
+
+@mcp.tool()
+async def create_table_records(
+    ctx: Context,
+    table_name: str,
+    records: Union[Dict[str, Any], List[Dict[str, Any]]],
+    return_rows: bool = False
+) -> Dict[str, Any]:
+    """
+    Creates one or multiple new records in a Supabase table.
+
+    Lists longer than INSERT_BATCH_SIZE are inserted in concurrent batches to stay under
+    PostgREST request limits. Each batch commits independently, so a failure in one batch
+    leaves the others in place; failed batches are reported under 'failed_batches' by their
+    start index and size, and the error is raised only if no record was created. A batch rejected
+    by a unique or exclusion violation is bisected and retried, and only the conflicting
+    records are reported under 'errors'. Lists longer than
+    COPY_THRESHOLD are loaded with COPY instead when SUPABASE_DB_URL is set for the session's
+    project (the one in SUPABASE_URL), return_rows is
+    False and no record holds a dictionary or list value.
+
+    Args:
+        ctx: The MCP context.
+        table_name (str): The name of the table to create the record(s) in.
+        records (Union[Dict[str, Any], List[Dict[str, Any]]]): A dictionary for a single record or a list of dictionaries for multiple records.
+        return_rows (bool): Whether to return the created rows; otherwise only the count is returned (default: False).
+
+    Returns:
+        Dict[str, Any]: Dictionary containing the created records' data, count, and status, plus
+        'errors' when some records conflicted with existing rows and 'failed_batches' when some
+        batches (or halves of a split batch) failed for another reason.
+    """
+    context = ctx.request_context.lifespan_context
+    try:
+        _validate(table_name)
+        rows = [records] if isinstance(records, dict) else records
+        if not rows or not isinstance(rows, list):
+            raise ValueError("Invalid records provided. Must be a non-empty dictionary or list.")
+        if not all(isinstance(r, dict) for r in rows):
+            raise ValueError("Invalid records list provided. All items must be dictionaries.")
+
+        # Only scalar rows are routed to COPY: it returns no rows, and adapts nested values
+        # differently from PostgREST, so the result must not depend on the batch size
+        db_url = _copy_db_url(context.client.supabase_url)
+        if (
+            db_url
+            and not return_rows
+            and len(rows) > COPY_THRESHOLD
+            and not any(isinstance(value, (dict, list)) for row in rows for value in row.values())
+        ):
+            count = await _copy_rows(db_url, table_name, rows)
+            _invalidate_rows(context.client.supabase_url, table_name)
+            return {"data": [], "count": count, "status": "success"}
+
+        builder = context.table(table_name)
+        options = _write_options(return_rows)
+        errors: List[Dict[str, Any]] = []
+        failures: List[Tuple[int, int, BaseException]] = []
+        semaphore = asyncio.Semaphore(INSERT_CONCURRENCY)
+
+        async def insert_batch(start: int) -> Tuple[List[Dict[str, Any]], int]:
+            batch = rows[start:start + INSERT_BATCH_SIZE]
+            async with semaphore:
+                if len(rows) == 1:
+                    # A single record has nothing to isolate, so its error is raised as is
+                    return _write_result(await builder.insert(batch, **options).execute(), return_rows)
+                return await _insert_with_fallback(builder, batch, options, return_rows, errors, failures, start)
+
+        starts = range(0, len(rows), INSERT_BATCH_SIZE)
+        try:
+            # Every batch runs to completion, so the result accounts for all rows that were committed
+            results = await asyncio.gather(*(insert_batch(start) for start in starts), return_exceptions=True)
+        finally:
+            _invalidate_rows(context.client.supabase_url, table_name)
+        failures.extend(
+            (start, min(INSERT_BATCH_SIZE, len(rows) - start), result)
+            for start, result in zip(starts, results) if isinstance(result, BaseException)
+        )
+        data = [row for result in results if not isinstance(result, BaseException) for row in result[0]]
+        count = sum(result[1] for result in results if not isinstance(result, BaseException))
+        failures.sort(key=lambda failure: failure[0])
+        if failures and count == 0:
+            # Nothing was committed, so the caller can safely retry the whole call
+            raise failures[0][2]
+        response = {"data": data, "count": count}
+        if errors:
+            response["errors"] = errors
+        if failures:
+            response["failed_batches"] = [
+                {"start": start, "size": size, "error": str(error)} for start, size, error in failures
+            ]
+        if errors or failures:
+            response["status"] = "partial success" if count > 0 else "no records created or error"
+        else:
+            response["status"] = "success" if count > 0 else "no records created or error"
+        return response
+    except Exception as e:
+        raise SupabaseToolError("creating record(s) in", table_name, e) from e
+
+@mcp.tool()
+async def copy_records(
+    ctx: Context,
+    table_name: str,
+    records: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Bulk loads records into a Supabase table using PostgreSQL COPY.
+
+    Note: This connects to Postgres directly and requires SUPABASE_DB_URL to be set
+    to the connection string of the project in SUPABASE_URL; sessions opened for another
+    project cannot use it. It is much faster than create_table_records for large loads
+    but does not return the created rows.
+
+    Args:
+        ctx: The MCP context.
+        table_name (str): The name of the table to load the records into.
+        records (List[Dict[str, Any]]): A non-empty list of dictionaries, one per record.
+
+    Returns:
+        Dict[str, Any]: Dictionary containing the loaded record count and status.
+    """
+    try:
+        _validate(table_name)
+        if not records or not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValueError("Invalid records provided. Must be a non-empty list of dictionaries.")
+        supabase_url = ctx.request_context.lifespan_context.client.supabase_url
+        db_url = _copy_db_url(supabase_url)
+        if not db_url:
+            raise ValueError("Missing SUPABASE_DB_URL for this project. Set it to the Postgres connection string of the project in SUPABASE_URL to use COPY.")
+        count = await _copy_rows(db_url, table_name, records)
+        _invalidate_rows(supabase_url, table_name)
+        return {"count": count, "status": "success"}
+    except Exception as e:
+        raise SupabaseToolError("copying records into", table_name, e) from e
+
+@mcp.tool()
+async def update_table_records(
+    ctx: Context,
+    table_name: str,
+    updates: Dict[str, Any],
+    filters: Dict[str, Any],
+    return_rows: bool = False
+) -> Dict[str, Any]:
+    """
+    Updates existing records in a Supabase table based on filters.
+
+    Args:
+        ctx: The MCP context.
+        table_name (str): The name of the table to update records in.
+        updates (Dict[str, Any]): A dictionary containing the updates to apply.
+        filters (Dict[str, Any]): A dictionary of column-value pairs to filter which rows to update.
+            List values match any of the given values.
+        return_rows (bool): Whether to return the updated rows; otherwise only the count is returned (default: False).
+
+    Returns:
+        Dict[str, Any]: Dictionary containing the updated records' data, count, and status.
+    """
+    context = ctx.request_context.lifespan_context
+    try:
+        _validate(table_name, filters=filters)
+        if not updates or not isinstance(updates, dict):
+            raise ValueError(_ERR_UPDATES)
+        if not filters:
+            raise ValueError(_ERR_FILTERS_REQUIRED)
+        query = _apply_filters(context.table(table_name).update(updates, **_write_options(return_rows)), filters)
+        data, count = _write_result(await query.execute(), return_rows)
+        _invalidate_rows(context.client.supabase_url, table_name)
+        return {"data": data, "count": count, "status": "success" if count > 0 else "no records updated or error"}
+    except Exception as e:
+        raise SupabaseToolError("updating records in", table_name, e) from e
+
+@mcp.tool()
+async def delete_table_records(
+    ctx: Context,
+    table_name: str,
+    filters: Dict[str, Any],
+    return_rows: bool = False
+) -> Dict[str, Any]:
+    """
+    Deletes records from a Supabase table based on filters.
+
+    Args:
+        ctx: The MCP context.
+        table_name (str): The name of the table to delete records from.
+        filters (Dict[str, Any]): A dictionary of column-value pairs to filter which rows to delete.
+            List values match any of the given values.
+        return_rows (bool): Whether to return the deleted rows; otherwise only the count is returned (default: False).
+
+    Returns:
+        Dict[str, Any]: Dictionary containing the deleted records' data, count, and status.
+    """
+    context = ctx.request_context.lifespan_context
+    try:
+        _validate(table_name, filters=filters)
+        if not filters:
+            raise ValueError(_ERR_FILTERS_REQUIRED)
+        query = _apply_filters(context.table(table_name).delete(**_write_options(return_rows)), filters)
+        data, count = _write_result(await query.execute(), return_rows)
+        _invalidate_rows(context.client.supabase_url, table_name)
+        return {"data": data, "count": count, "status": "success" if count > 0 else "no records deleted or error"}
+    except Exception as e:
+        raise SupabaseToolError("deleting records from", table_name, e) from e
+
+@mcp.tool()
+async def create_table(
+    ctx: Context,
+    table_name: str,
+    # Exposed to clients as 'schema'; a field of that name would shadow BaseModel.schema
+    columns: Annotated[list, Field(alias="schema")]
+) -> dict:
+    """
+    Creates a new table in the Supabase database using an RPC call.
+
+    Note: This requires the PostgreSQL function 'create_new_table(p_table_name TEXT, p_columns JSONB)'
+    to be defined in your Supabase SQL editor.
+
+    Args:
+        ctx: The MCP context.
+        table_name (str): The name of the table to create. Must be a valid PostgreSQL identifier.
+        columns (list): The 'schema' argument; a list of column definitions. Each item must be a
+                       dictionary containing 'name' (str), 'type' (str, e.g., 'TEXT', 'INT'), and
+                       optionally 'constraints' (str, e.g., 'PRIMARY KEY', 'NOT NULL').
+
+    Returns:
+        dict: Contains 'success' (bool) and 'message' (str) indicating the result from the RPC call.
+    """
+    supabase = ctx.request_context.lifespan_context.client
+    try:
+        _validate(table_name)
+        definitions = _COLUMNS_ADAPTER.validate_python(columns)
+        payload = [column.model_dump(exclude_none=True) for column in definitions]
+        response = await supabase.rpc('create_new_table', {'p_table_name': table_name, 'p_columns': payload}).execute()
+        message = str(response.data) if response.data else "No response message from RPC."
+        # "table created successfully" contains "successfully", so one scan covers both
+        success = "successfully" in message.casefold()
+        if success:
+            _tables_cache.clear()
+        return {'success': success, 'message': message}
+    except Exception as e:
+        return {'success': False, 'message': f"An error occurred during create_table: {str(e)}"}
+
+async def _describe_schema(supabase: AsyncClient, use_cache: bool) -> Dict[str, List[str]]:
+    """
+    Fetches the table and column names of the 'public' schema in a single RPC call.
+
+    Args:
+        supabase: The Supabase client.
+        use_cache (bool): Whether to reuse a result fetched within the last 30 seconds.
+
+    Returns:
+        Dict[str, List[str]]: Table names mapped to their column names in ordinal order.
+    """
+    cache_key = (supabase.supabase_url, supabase.supabase_key, 'public')
+    if use_cache:
+        cached = _tables_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = await supabase.rpc('describe_schema', {'schema_name': 'public'}).execute()
+    schema = response.data or {}
+    if not isinstance(schema, dict):
+        raise ValueError("Unexpected payload returned by describe_schema.")
+    _tables_cache[cache_key] = schema
+    return schema
+
+@mcp.tool()
+async def describe_schema(ctx: Context, use_cache: bool = True) -> Dict[str, List[str]]:
+    """
+    Describes all tables in the 'public' schema and their columns using a single RPC call.
+
+    Note: This requires the PostgreSQL function 'describe_schema(schema_name TEXT DEFAULT 'public')'
+    from changes_db.sql to be defined in your Supabase SQL editor.
+
+    Args:
+        ctx: The MCP context.
+        use_cache (bool): Whether to reuse a schema fetched within the last 30 seconds (default: True).
+
+    Returns:
+        Dict[str, List[str]]: Table names mapped to their column names.
     """
     supabase = ctx.request_context.lifespan_context.client
     try:
-        if not table_name or not isinstance(table_name, str):
-            raise ValueError("Invalid table_name provided. Must be a non-empty string.")
-        if limit is not None and (not isinstance(limit, int) or limit <= 0):
-            raise ValueError("Invalid limit provided. Must be a positive integer.")
-
-        query = supabase.table(table_name).select(columns)
-        if filters:
-            if not isinstance(filters, dict):
-                raise ValueError("Invalid filters provided. Must be a dictionary.")
-            for column, value in filters.items():
-                query = query.eq(column, value)
-        if order_by:
-            if not isinstance(order_by, str):
-                raise ValueError("Invalid order_by provided. Must be a string.")
-            query = query.order(order_by, descending=not ascending)
-        if limit:
-            query = query.limit(limit)
-        response = query.execute()
-        return response.data
+        return await _describe_schema(supabase, use_cache)
     except Exception as e:
-        raise Exception(f"An error occurred while reading rows from table '{table_name}': {str(e)}") from e
-
-# @mcp.tool()
-# def create_table_records(
-#     ctx: Context,
-#     table_name: str,
-#     records: Union[Dict[str, Any], List[Dict[str, Any]]]
-# ) -> Dict[str, Any]:
-#     """
-#     Creates one or multiple new records in a Supabase table.
-
-#     Args:
-#         ctx: The MCP context.
-#         table_name (str): The name of the table to create the record(s) in.
-#         records (Union[Dict[str, Any], List[Dict[str, Any]]]): A dictionary for a single record or a list of dictionaries for multiple records.
-
-#     Returns:
-#         Dict[str, Any]: Dictionary containing the created records' data, count, and status.
-#     """
-#     supabase = ctx.request_context.lifespan_context.client
-#     try:
-#         if not table_name or not isinstance(table_name, str):
-#             raise ValueError("Invalid table_name provided. Must be a non-empty string.")
-#         if not records or not (isinstance(records, dict) or isinstance(records, list)):
-#             raise ValueError("Invalid records provided. Must be a non-empty dictionary or list.")
-#         if isinstance(records, list) and not all(isinstance(r, dict) for r in records):
-#             raise ValueError("Invalid records list provided. All items must be dictionaries.")
-#         response = supabase.table(table_name).insert(records).execute()
-#         data = response.data
-#         count = len(data) if data else 0
-#         return {"data": data, "count": count, "status": "success" if count > 0 else "no records created or error"}
-#     except Exception as e:
-#         raise Exception(f"An error occurred while creating record(s) in table '{table_name}': {str(e)}") from e
-
-# @mcp.tool()
-# def update_table_records(
-#     ctx: Context,
-#     table_name: str,
-#     updates: Dict[str, Any],
-#     filters: Dict[str, Any]
-# ) -> Dict[str, Any]:
-#     """
-#     Updates existing records in a Supabase table based on filters.
-
-#     Args:
-#         ctx: The MCP context.
-#         table_name (str): The name of the table to update records in.
-#         updates (Dict[str, Any]): A dictionary containing the updates to apply.
-#         filters (Dict[str, Any]): A dictionary of column-value pairs to filter which rows to update.
-
-#     Returns:
-#         Dict[str, Any]: Dictionary containing the updated records' data, count, and status.
-#     """
-#     supabase = ctx.request_context.lifespan_context.client
-#     try:
-#         if not table_name or not isinstance(table_name, str):
-#             raise ValueError("Invalid table_name provided. Must be a non-empty string.")
-#         if not updates or not isinstance(updates, dict):
-#             raise ValueError("Invalid updates provided. Must be a non-empty dictionary.")
-#         if not filters or not isinstance(filters, dict):
-#             raise ValueError("Invalid filters provided. Must be a non-empty dictionary.")
-#         query = supabase.table(table_name).update(updates)
-#         for column, value in filters.items():
-#             query = query.eq(column, value)
-#         response = query.execute()
-#         data = response.data
-#         count = len(data) if data else 0
-#         return {"data": data, "count": count, "status": "success" if count > 0 else "no records updated or error"}
-#     except Exception as e:
-#         raise Exception(f"An error occurred while updating records in table '{table_name}': {str(e)}") from e
-
-# @mcp.tool()
-# def delete_table_records(
-#     ctx: Context,
-#     table_name: str,
-#     filters: Dict[str, Any]
-# ) -> Dict[str, Any]:
-#     """
-#     Deletes records from a Supabase table based on filters.
-
-#     Args:
-#         ctx: The MCP context.
-#         table_name (str): The name of the table to delete records from.
-#         filters (Dict[str, Any]): A dictionary of column-value pairs to filter which rows to delete.
-
-#     Returns:
-#         Dict[str, Any]: Dictionary containing the deleted records' data, count, and status.
-#     """
-#     supabase = ctx.request_context.lifespan_context.client
-#     try:
-#         if not table_name or not isinstance(table_name, str):
-#             raise ValueError("Invalid table_name provided. Must be a non-empty string.")
-#         if not filters or not isinstance(filters, dict):
-#             raise ValueError("Invalid filters provided. Must be a non-empty dictionary.")
-#         query = supabase.table(table_name).delete()
-#         for column, value in filters.items():
-#             query = query.eq(column, value)
-#         response = query.execute()
-#         data = response.data
-#         count = len(data) if data else 0
-#         return {"data": data, "count": count, "status": "success" if count > 0 else "no records deleted or error"}
-#     except Exception as e:
-#         raise Exception(f"An error occurred while deleting records from table '{table_name}': {str(e)}") from e
-
-# @mcp.tool()
-# def create_table(ctx: Context, table_name: str, schema: list) -> dict:
-#     """
-#     Creates a new table in the Supabase database using an RPC call.
-
-#     Note: This requires the PostgreSQL function 'create_new_table(p_table_name TEXT, p_columns JSONB)'
-#     to be defined in your Supabase SQL editor.
-
-#     Args:
-#         ctx: The MCP context.
-#         table_name (str): The name of the table to create. Must be a valid PostgreSQL identifier.
-#         schema (list): A list of column definitions. Each item must be a dictionary
-#                        containing 'name' (str), 'type' (str, e.g., 'TEXT', 'INT'),
-#                        and optionally 'constraints' (str, e.g., 'PRIMARY KEY', 'NOT NULL').
-
-#     Returns:
-#         dict: Contains 'success' (bool) and 'message' (str) indicating the result from the RPC call.
-#     """
-#     supabase = ctx.request_context.lifespan_context.client
-#     try:
-#         if not table_name or not isinstance(table_name, str):
-#             return {'success': False, 'message': "Invalid table name - must be a non-empty string."}
-#         if not schema or not isinstance(schema, list):
-#             return {'success': False, 'message': "Invalid schema - must be a non-empty list of column definitions."}
-#         for col in schema:
-#             if not isinstance(col, dict) or 'name' not in col or 'type' not in col:
-#                 return {'success': False, 'message': "Invalid column definition: Each column must be a dict with 'name' and 'type'."}
-#             if not isinstance(col['name'], str) or not col['name']:
-#                 return {'success': False, 'message': f"Invalid column name: '{col['name']}' must be a non-empty string."}
-#             if not isinstance(col['type'], str) or not col['type']:
-#                 return {'success': False, 'message': f"Invalid column type for '{col['name']}': Type must be a non-empty string."}
-#             if 'constraints' in col and not isinstance(col.get('constraints'), str):
-#                 return {'success': False, 'message': f"Invalid constraints for '{col['name']}': Constraints must be a string."}
-#         response = supabase.rpc('create_new_table', {'p_table_name': table_name, 'p_columns': schema}).execute()
-#         message = response.data if response.data else "No response message from RPC."
-#         success = "successfully" in str(message).lower() or "table created successfully" in str(message).lower()
-#         return {'success': success, 'message': str(message)}
-#     except Exception as e:
-#         return {'success': False, 'message': f"An error occurred during create_table: {str(e)}"}
+        raise SupabaseToolError("describing the schema", None, e) from e
+
+async def _list_table_names(supabase: AsyncClient, use_cache: bool) -> List[str]:
+    """
+    Lists the tables of the 'public' schema with the older list_tables_in_schema RPC call.
+
+    Used by list_tables on deployments where describe_schema has not been installed.
+
+    Args:
+        supabase: The Supabase client.
+        use_cache (bool): Whether to reuse a result fetched within the last 30 seconds.
+
+    Returns:
+        List[str]: The table names.
+    """
+    cache_key = (supabase.supabase_url, supabase.supabase_key, 'public', 'names')
+    if use_cache:
+        cached = _tables_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = await supabase.rpc('list_tables_in_schema', {'schema_name': 'public'}).execute()
+    tables = []
+    if response.data:
+        # The RPC always returns {'table_name': ...} rows, so skip per-row guards
+        try:
+            tables = [row['table_name'] for row in response.data]
+        except (KeyError, TypeError) as e:
+            raise ValueError("Unexpected payload returned by list_tables_in_schema.") from e
+    _tables_cache[cache_key] = tables
+    return tables
 
 @mcp.tool()
-def list_tables(ctx: Context) -> list:
+async def list_tables(ctx: Context, use_cache: bool = True) -> list:
     """
     Lists all tables in the 'public' schema of the Supabase database using an RPC call.
 
-    Note: This requires the PostgreSQL function 'list_tables_in_schema(schema_name TEXT DEFAULT 'public')'
-    to be defined in your Supabase SQL editor.
+    The result is a projection of describe_schema, so a following describe_schema call
+    is served from the cache.
+
+    Note: This requires the PostgreSQL function 'describe_schema(schema_name TEXT DEFAULT 'public')'
+    or, on older setups, 'list_tables_in_schema(schema_name TEXT DEFAULT 'public')' from
+    changes_db.sql to be defined in your Supabase SQL editor.
 
     Args:
         ctx: The MCP context.
+        use_cache (bool): Whether to reuse a table list fetched within the last 30 seconds (default: True).
 
     Returns:
         list: A list of table names in the public schema.
     """
     supabase = ctx.request_context.lifespan_context.client
     try:
-        response = supabase.rpc('list_tables_in_schema', {'schema_name': 'public'}).execute()
-        if response.data:
-            return [table['table_name'] for table in response.data if isinstance(table, dict) and 'table_name' in table]
-        return []
+        if use_cache:
+            # Only the fallback fills this entry, so setups without describe_schema skip the failing call
+            names = _tables_cache.get((supabase.supabase_url, supabase.supabase_key, 'public', 'names'))
+            if names is not None:
+                return names
+        try:
+            return list(await _describe_schema(supabase, use_cache))
+        except APIError as e:
+            # PGRST202: the function is not in PostgREST's schema cache, i.e. not installed
+            if e.code != FUNCTION_NOT_FOUND:
+                raise
+        return await _list_table_names(supabase, use_cache)
     except Exception as e:
-        raise Exception(f"An error occurred while listing tables: {str(e)}") from e
+        raise SupabaseToolError("listing tables", None, e) from e
 
 if __name__ == "__main__":
-    mcp.run()
+    # Use MCP_TRANSPORT=sse to run a long-lived server shared by several clients
+    mcp.run(transport=os.getenv("MCP_TRANSPORT", "stdio"))
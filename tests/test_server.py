@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from cachetools import TTLCache
+from postgrest import APIError
+from supabase import acreate_client
+
+import server
+from server import (
+    SupabaseContext, _apply_filters, _insert_with_fallback, _invalidate_rows, _paginate,
+    _write_options, create_table_records, list_tables
+)
+
+# A syntactically valid (unsigned) JWT, as supabase-py validates the key format
+TEST_KEY = "eyJhbGciOiJIUzI1NiJ9.e30.ZRrHA1JJJW8opsbCGfG_HACGpVUMN_a9IV7pAx_Zmeo"
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(server, '_rows_cache', TTLCache(maxsize=512, ttl=10))
+    monkeypatch.setattr(server, '_tables_cache', TTLCache(maxsize=128, ttl=30))
+
+@pytest_asyncio.fixture
+async def context():
+    client = await acreate_client('https://test.supabase.co', TEST_KEY)
+    return SupabaseContext(client=client)
+
+@pytest.mark.asyncio
+async def test_select_copy_leaves_template_unchanged(context):
+    # SupabaseContext.select relies on postgrest reassigning params rather than mutating them
+    context.select('t', 'id')
+    template = context.selects[('t', 'id')]
+    params, headers = str(template.params), dict(template.headers)
+
+    query = _apply_filters(context.select('t', 'id'), {'name': 'a', 'id': [1, 2]})
+    query = query.order('id', desc=True).limit(5)
+    query.headers['x-test'] = '1'
+
+    assert str(query.params) != params
+    assert str(template.params) == params
+    assert dict(template.headers) == headers
+    assert str(context.select('t', 'id').params) == params
+
+@pytest.mark.asyncio
+async def test_apply_filters_emits_primary_key_first(context):
+    query = _apply_filters(context.select('t', '*'), {'name': 'a', 'id': [1, 2], 'b': 1})
+    assert str(query.params) == 'select=%2A&id=in.%281%2C2%29&b=eq.1&name=eq.a'
+
+class FakeBuilder:
+    """Stands in for a table's request builder; reject(rows) returns an error code or None."""
+
+    def __init__(self, reject=lambda rows: None):
+        self.reject = reject
+        self.requests = 0
+
+    def insert(self, rows, **options):
+        self.requests += 1
+        return SimpleNamespace(execute=lambda: self._execute(rows))
+
+    async def _execute(self, rows):
+        code = self.reject(rows)
+        if code:
+            raise APIError({'code': code, 'message': 'rejected'})
+        return SimpleNamespace(data=[], count=len(rows))
+
+def rejecting(is_bad, code='23505'):
+    return lambda rows: code if any(is_bad(row) for row in rows) else None
+
+async def insert(builder, rows):
+    errors, failures = [], []
+    data, count = await _insert_with_fallback(builder, rows, _write_options(False), False, errors, failures)
+    return count, errors, failures
+
+@pytest.mark.asyncio
+async def test_insert_with_fallback_success():
+    builder = FakeBuilder()
+    assert await insert(builder, [{'id': i} for i in range(8)]) == (8, [], [])
+    assert builder.requests == 1
+
+@pytest.mark.asyncio
+async def test_insert_with_fallback_isolates_conflicting_row():
+    builder = FakeBuilder(rejecting(lambda row: row['id'] == 3))
+    count, errors, failures = await insert(builder, [{'id': i} for i in range(8)])
+    assert count == 7
+    assert errors == [{'record': {'id': 3}, 'error': 'rejected'}]
+    assert failures == []
+    assert builder.requests == 7
+
+@pytest.mark.asyncio
+async def test_insert_with_fallback_raises_when_every_row_violates_not_null():
+    builder = FakeBuilder(rejecting(lambda row: True, code='23502'))
+    with pytest.raises(APIError):
+        await insert(builder, [{'id': i} for i in range(500)])
+    assert builder.requests == 1
+
+@pytest.mark.asyncio
+async def test_insert_with_fallback_raises_other_errors():
+    builder = FakeBuilder(rejecting(lambda row: True, code='42P01'))
+    with pytest.raises(APIError):
+        await insert(builder, [{'id': 1}, {'id': 2}])
+    assert builder.requests == 1
+
+@pytest.mark.asyncio
+async def test_insert_with_fallback_keeps_committed_half_when_other_half_fails():
+    # The full batch conflicts; after the split rows 0-3 commit and rows 4-7 hit a statement timeout
+    def reject(rows):
+        if len(rows) == 8:
+            return '23505'
+        return '57014' if rows[0]['id'] >= 4 else None
+
+    builder = FakeBuilder(reject)
+    count, errors, failures = await insert(builder, [{'id': i} for i in range(8)])
+    assert count == 4
+    assert errors == []
+    assert [(offset, size, error.code) for offset, size, error in failures] == [(4, 4, '57014')]
+    assert builder.requests == 3
+
+@pytest.mark.asyncio
+async def test_create_table_records_reports_partial_commit_instead_of_raising():
+    def reject(rows):
+        if len(rows) == 8:
+            return '23505'
+        return '57014' if rows[0]['id'] >= 4 else None
+
+    context = SimpleNamespace(table=lambda name: FakeBuilder(reject), client=SimpleNamespace(supabase_url='https://test.supabase.co'))
+    ctx = SimpleNamespace(request_context=SimpleNamespace(lifespan_context=context))
+    result = await create_table_records(ctx, 't', [{'id': i} for i in range(8)])
+    assert result['count'] == 4
+    assert result['status'] == 'partial success'
+    assert [(batch['start'], batch['size']) for batch in result['failed_batches']] == [(4, 4)]
+
+class FakePagedQuery:
+    """Serves rows by offset like PostgREST with a max-rows setting of 10."""
+
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    def range(self, start, end):
+        self.log.append((start, end))
+        page = self.rows[start:min(end, start + 9) + 1]
+        return SimpleNamespace(execute=lambda: self._page(page))
+
+    async def _page(self, page):
+        return SimpleNamespace(data=page)
+
+async def paginate(page_size, limit=None):
+    rows, log = [{'id': i} for i in range(25)], []
+    result = [row async for row in _paginate(lambda: FakePagedQuery(rows, log), page_size, limit)]
+    return result, log
+
+@pytest.mark.asyncio
+async def test_paginate_continues_past_pages_capped_by_max_rows():
+    result, log = await paginate(100)
+    assert [row['id'] for row in result] == list(range(25))
+    assert log == [(0, 99), (10, 109), (20, 119), (25, 124)]
+
+@pytest.mark.asyncio
+async def test_paginate_stops_at_limit():
+    result, log = await paginate(4, limit=10)
+    assert [row['id'] for row in result] == list(range(10))
+    assert log == [(0, 3), (4, 7), (8, 9)]
+
+def test_invalidate_rows_drops_only_the_written_table():
+    url, other = 'https://test.supabase.co', 'https://other.supabase.co'
+    for key in [(url, 'anon', 't'), (url, 'service', 't'), (url, 'anon', 'u'), (other, 'anon', 't')]:
+        server._rows_cache[key + ('*',)] = []
+    _invalidate_rows(url, 't')
+    assert sorted(key[:3] for key in server._rows_cache) == [(other, 'anon', 't'), (url, 'anon', 'u')]
+
+@pytest.mark.asyncio
+async def test_client_eviction_waits_for_release(monkeypatch):
+    async def _noop(client):
+        return None
+    monkeypatch.setattr(server, '_prewarm', _noop)
+    monkeypatch.setattr(server, '_clients', OrderedDict())
+    monkeypatch.setattr(server, '_client_users', {})
+    monkeypatch.setattr(server, 'MAX_CLIENTS', 1)
+
+    first = await server._client('https://a.supabase.co', TEST_KEY)
+    assert await server._client('https://a.supabase.co', TEST_KEY) is first
+    second = await server._client('https://b.supabase.co', TEST_KEY)
+    assert list(server._clients.values()) == [second]
+
+    # The evicted client is still used by two lifespans, so it is closed only after both release it
+    await server._release_client(first)
+    assert not first.postgrest.session.is_closed
+    await server._release_client(first)
+    assert first.postgrest.session.is_closed
+
+    await server._release_client(second)
+    assert not second.postgrest.session.is_closed
+
+@pytest.mark.asyncio
+async def test_list_tables_falls_back_without_describe_schema(context):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith('/describe_schema'):
+            return httpx.Response(404, json={'code': 'PGRST202', 'message': 'Could not find the function'})
+        return httpx.Response(200, json=[{'table_name': 'a'}, {'table_name': 'b'}])
+
+    context.client.postgrest.session._transport = httpx.MockTransport(handler)
+    ctx = SimpleNamespace(request_context=SimpleNamespace(lifespan_context=context))
+    assert await list_tables(ctx) == ['a', 'b']
+    assert await list_tables(ctx) == ['a', 'b']
+    assert requests == ['/rest/v1/rpc/describe_schema', '/rest/v1/rpc/list_tables_in_schema']